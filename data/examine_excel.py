@@ -2,8 +2,88 @@
 Examine Excel file structure to understand the data format
 """
 
-import pandas as pd
+import numpy as np
+import io
 import os
+import sys
+from functools import partial
+
+from excel_loader import list_sheet_names, load_sheet
+
+# Enough rows to infer dtypes and spot country/year columns without parsing whole sheets
+SAMPLE_ROWS = 200
+
+def describe_sheet(file_path, sheet_name):
+    """Load one sheet and build its analysis report as a single string.
+
+    The report is written to the terminal in one call per sheet rather than
+    line by line, which keeps stdout flushes down on wide workbooks.
+    """
+    out = io.StringIO()
+    emit = partial(print, file=out)
+    
+    emit(f"\n📄 Sheet: '{sheet_name}'")
+    emit("-" * 50)
+    
+    try:
+        df = load_sheet(file_path, sheet_name, nrows=SAMPLE_ROWS + 1)
+        
+        # One extra row is read so a sheet of exactly SAMPLE_ROWS is not flagged
+        truncated = len(df) > SAMPLE_ROWS
+        if truncated:
+            df = df.head(SAMPLE_ROWS)
+        rows_label = f"{df.shape[0]}+" if truncated else f"{df.shape[0]}"
+        emit(f"   Shape: {rows_label} rows × {df.shape[1]} columns")
+        if truncated:
+            emit(f"   (analysis below uses the first {SAMPLE_ROWS} rows)")
+        emit(f"   Columns: {list(df.columns)}")
+        
+        # Show data types
+        emit(f"   Data types:")
+        for col, dtype in df.dtypes.items():
+            emit(f"     - {col}: {dtype}")
+        
+        # Show first few rows
+        emit(f"   First 5 rows:")
+        emit(df.head(5).to_string(index=False))
+        
+        # Check for missing values
+        missing = df.isnull().sum()
+        if missing.sum() > 0:
+            emit(f"   Missing values:")
+            for col, count in missing[missing > 0].items():
+                emit(f"     - {col}: {count} missing")
+        else:
+            emit(f"   ✅ No missing values")
+        
+        # Split columns by dtype once for the detection passes below
+        numeric = df.select_dtypes(include=[np.number])
+        text = df.select_dtypes(include=['object', 'string'])
+        
+        # Look for potential indicators
+        emit(f"   Potential indicators (numeric columns):")
+        for col, non_null_count in numeric.count().items():
+            emit(f"     - {col}: {non_null_count} non-null values")
+        
+        # Look for country-like columns
+        emit(f"   Potential country columns:")
+        unique_counts = text.nunique(dropna=True)
+        for col in unique_counts[unique_counts <= 20].index:  # Reasonable number of countries
+            unique_vals = text[col].dropna().unique()
+            emit(f"     - {col}: {len(unique_vals)} unique values: {list(unique_vals)[:5]}")
+        
+        # Look for year-like columns
+        emit(f"   Potential year columns:")
+        in_year_range = (numeric.ge(1900) & numeric.le(2030)) | numeric.isna()
+        year_like = in_year_range.all() & (numeric.nunique(dropna=True) > 1)
+        for col in year_like[year_like].index:
+            unique_vals = numeric[col].dropna().unique()
+            emit(f"     - {col}: {len(unique_vals)} unique values: {sorted(unique_vals)[:5]}")
+        
+    except Exception as e:
+        emit(f"   ❌ Error reading sheet: {e}")
+    
+    return out.getvalue()
 
 def examine_excel_file():
     """Examine the Excel file in detail"""
@@ -17,66 +97,16 @@ def examine_excel_file():
     print("=" * 60)
     
     try:
-        xl = pd.ExcelFile(file_path)
-        print(f"📊 Found {len(xl.sheet_names)} sheets:")
-        for i, sheet in enumerate(xl.sheet_names, 1):
+        sheet_names = list_sheet_names(file_path)
+        print(f"📊 Found {len(sheet_names)} sheets:")
+        for i, sheet in enumerate(sheet_names, 1):
             print(f"   {i}. {sheet}")
         
         print(f"\n📋 DETAILED ANALYSIS:")
         print("=" * 60)
         
-        for sheet_name in xl.sheet_names:
-            print(f"\n📄 Sheet: '{sheet_name}'")
-            print("-" * 50)
-            
-            try:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-                print(f"   Shape: {df.shape[0]} rows × {df.shape[1]} columns")
-                print(f"   Columns: {list(df.columns)}")
-                
-                # Show data types
-                print(f"   Data types:")
-                for col, dtype in df.dtypes.items():
-                    print(f"     - {col}: {dtype}")
-                
-                # Show first few rows
-                print(f"   First 5 rows:")
-                print(df.head(5).to_string(index=False))
-                
-                # Check for missing values
-                missing = df.isnull().sum()
-                if missing.sum() > 0:
-                    print(f"   Missing values:")
-                    for col, count in missing[missing > 0].items():
-                        print(f"     - {col}: {count} missing")
-                else:
-                    print(f"   ✅ No missing values")
-                
-                # Look for potential indicators
-                print(f"   Potential indicators (numeric columns):")
-                numeric_cols = [col for col in df.columns if df[col].dtype in ['int64', 'float64']]
-                for col in numeric_cols:
-                    non_null_count = df[col].count()
-                    print(f"     - {col}: {non_null_count} non-null values")
-                
-                # Look for country-like columns
-                print(f"   Potential country columns:")
-                for col in df.columns:
-                    if df[col].dtype == 'object':
-                        unique_vals = df[col].dropna().unique()
-                        if len(unique_vals) <= 20:  # Reasonable number of countries
-                            print(f"     - {col}: {len(unique_vals)} unique values: {list(unique_vals)[:5]}")
-                
-                # Look for year-like columns
-                print(f"   Potential year columns:")
-                for col in df.columns:
-                    if df[col].dtype in ['int64', 'float64']:
-                        unique_vals = df[col].dropna().unique()
-                        if len(unique_vals) > 1 and all(1900 <= v <= 2030 for v in unique_vals if pd.notna(v)):
-                            print(f"     - {col}: {len(unique_vals)} unique values: {sorted(unique_vals)[:5]}")
-                
-            except Exception as e:
-                print(f"   ❌ Error reading sheet: {e}")
+        for sheet_name in sheet_names:
+            sys.stdout.write(describe_sheet(file_path, sheet_name))
         
         print(f"\n✅ Analysis complete!")
         
@@ -0,0 +1,57 @@
+"""
+Shared Excel loading for the Western Balkans Dashboard data scripts
+Parses every sheet of a workbook in one pass and keeps the result in memory
+"""
+
+import pandas as pd
+import os
+from functools import lru_cache
+
+# Prefer the Rust-based calamine reader when available; fall back to openpyxl.
+# pandas only knows the calamine engine from 2.2 onwards.
+PANDAS_HAS_CALAMINE = tuple(int(part) for part in pd.__version__.split(".")[:2]) >= (2, 2)
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine" if PANDAS_HAS_CALAMINE else "openpyxl"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+@lru_cache(maxsize=1)
+def _load_all_sheets(file_path, mtime, nrows):
+    """Read every sheet of the workbook with a single open of the archive.
+
+    Returns (sheets, error). A failed read is cached as well, so a workbook
+    with one unreadable sheet is not parsed again for every caller.
+    """
+    try:
+        return pd.read_excel(file_path, sheet_name=None, nrows=nrows, engine=EXCEL_ENGINE), None
+    except Exception as e:
+        return None, e
+
+def list_sheet_names(file_path):
+    """Return the sheet names of the workbook without parsing any sheet"""
+    with pd.ExcelFile(file_path, engine=EXCEL_ENGINE) as xl:
+        return xl.sheet_names
+
+def load_all_sheets(file_path, nrows=None):
+    """Return a {sheet_name: DataFrame} dict for the workbook at file_path.
+
+    Results are reused until the file's modification time changes.
+    The returned frames are shared, so callers must not modify them in place.
+    """
+    sheets, error = _load_all_sheets(os.path.abspath(file_path), os.path.getmtime(file_path), nrows)
+    if error is not None:
+        raise error
+    return sheets
+
+def load_sheet(file_path, sheet_name, nrows=None):
+    """Return one sheet, taken from the shared single-pass read when possible.
+
+    If any sheet breaks the bulk read, only the requested sheet is read, so
+    one bad sheet does not take the others down with it.
+    """
+    try:
+        sheets = load_all_sheets(file_path, nrows)
+    except Exception:
+        return pd.read_excel(file_path, sheet_name=sheet_name, nrows=nrows, engine=EXCEL_ENGINE)
+    return sheets[sheet_name]
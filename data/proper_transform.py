@@ -8,6 +8,29 @@ import json
 import os
 from datetime import datetime
 import numpy as np
+import glob
+import hashlib
+import logging
+import pickle
+import sys
+from functools import wraps
+
+from excel_loader import EXCEL_ENGINE, list_sheet_names, load_sheet
+
+log = logging.getLogger(__name__)
+
+# orjson serializes considerably faster than the stdlib json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# pyarrow enables the columnar Parquet export alongside the JSON file
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 
 # Define the indicator names for each sheet
 INDICATOR_NAMES = {
@@ -51,148 +74,354 @@ INDICATOR_CATEGORIES = {
     17: "Digital Capabilities"
 }
 
+# Field order of each exported data point
+DATA_POINT_COLUMNS = ["indicator", "country", "year", "value", "category", "layer", "unit"]
+
+# Identifier columns that are never year columns
+ID_COLUMNS = frozenset(['Code', 'Region', 'Income group', 'PartnerISO3', 'TradeFlowName'])
+
+# Explicit dtypes for the numeric fields; an empty dataset would otherwise
+# carry object arrays, which orjson cannot serialize
+NUMERIC_DTYPES = {"year": np.int64, "value": np.float64}
+
+# Repeating string fields, held as categoricals and dictionary-encoded in the JSON output
+DICTIONARY_COLUMNS = ["indicator", "country", "category", "layer", "unit"]
+
+# Set PRETTY_JSON=1 to write human-readable JSON instead of compact output
+PRETTY_JSON = os.environ.get("PRETTY_JSON") == "1"
+
+# Output artifacts, relative to the data directory
+OUTPUT_FILE = "transformed_data_v2/consolidated_dataset.json"
+PARQUET_FILE = "transformed_data_v2/consolidated_dataset.parquet"
+# Content hash of the inputs that produced the current outputs
+SOURCE_KEY_FILE = "transformed_data_v2/consolidated_dataset.sourcekey"
+
+# Per-sheet transform results are cached here between runs
+CACHE_DIR = ".cache"
+
+def cached_to_disk(func):
+    """Cache results of func(file_path, *args) as pickles in CACHE_DIR.
+
+    Entries are keyed on the input file's path and modification time, the
+    modification times of this script and the Excel loader, the Excel engine
+    and the pandas version, so editing the workbook or the transform code
+    invalidates them. None results mark a read error and are never cached, and
+    writing an entry removes older ones for the same call.
+    """
+    loader_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "excel_loader.py")
+    
+    @wraps(func)
+    def wrapper(file_path, *args):
+        call_source = repr((func.__name__, os.path.abspath(file_path), args))
+        version_source = repr((
+            os.path.getmtime(file_path),
+            os.path.getmtime(__file__),
+            os.path.getmtime(loader_file),
+            EXCEL_ENGINE,
+            pd.__version__,
+        ))
+        call_key = hashlib.sha1(call_source.encode('utf-8')).hexdigest()[:16]
+        version_key = hashlib.sha1(version_source.encode('utf-8')).hexdigest()[:16]
+        cache_file = os.path.join(CACHE_DIR, f"{call_key}-{version_key}.pkl")
+        
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'rb') as f:
+                    result = pickle.load(f)
+                log.debug("\n♻️ Reusing cached %s%r", func.__name__, args)
+                return result
+            except Exception:
+                pass  # Unreadable entry, recompute and overwrite it
+        
+        result = func(file_path, *args)
+        
+        # Drop entries left by earlier versions of the inputs
+        for stale in glob.glob(os.path.join(CACHE_DIR, f"{call_key}-*.pkl")):
+            if stale != cache_file:
+                os.remove(stale)
+        
+        if result is None:
+            return result  # Retry on the next run rather than caching the failure
+        
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(tmp_file, cache_file)
+        return result
+    return wrapper
+
+def source_key(file_path):
+    """Hash the workbook, the transform code and the output settings.
+
+    If this matches SOURCE_KEY_FILE, rerunning would rewrite identical data.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    loader_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "excel_loader.py")
+    for path in (file_path, __file__, loader_file):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    digest.update(repr((PRETTY_JSON, HAS_PYARROW)).encode('utf-8'))
+    return digest.hexdigest()
+
+def outputs_up_to_date(key):
+    """Return True if the outputs on disk were produced from the same inputs"""
+    expected = [OUTPUT_FILE, SOURCE_KEY_FILE] + ([PARQUET_FILE] if HAS_PYARROW else [])
+    if not all(os.path.exists(path) for path in expected):
+        return False
+    with open(SOURCE_KEY_FILE, encoding='utf-8') as f:
+        return f.read().strip() == key
+
+def _json_default(obj):
+    """Convert numpy arrays and scalars for the stdlib json fallback"""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dump_json_bytes(obj, indent=False):
+    """Serialize obj to UTF-8 JSON bytes, compact or indented by 2 spaces"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False, check_circular=False, default=_json_default).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, check_circular=False, default=_json_default).encode('utf-8')
+
+def encode_columns(dataset):
+    """Split the long-form dataset into dictionary-encoded column arrays.
+
+    String columns become integer codes into a sorted per-column vocabulary,
+    so each country or indicator name is stored once rather than per point.
+    """
+    dictionaries = {}
+    columns = {}
+    for col in DATA_POINT_COLUMNS:
+        if col in DICTIONARY_COLUMNS:
+            codes, uniques = pd.factorize(dataset[col], sort=True)
+            columns[col] = codes
+            dictionaries[col] = uniques.tolist()
+        else:
+            columns[col] = dataset[col].to_numpy(dtype=NUMERIC_DTYPES[col])
+    return dictionaries, columns
+
+def write_consolidated_json(metadata, dictionaries, columns, output_file):
+    """Write the consolidated dataset in columnar form.
+
+    Data points are stored as parallel arrays under "columns"; string columns
+    hold indices into the matching list under "dictionaries". The file is
+    fully compact unless PRETTY_JSON is set, in which case metadata and
+    dictionaries are indented and each column sits on its own line.
+    """
+    if not PRETTY_JSON:
+        document = {"metadata": metadata, "dictionaries": dictionaries, "columns": columns}
+        with open(output_file, 'wb') as f:
+            f.write(dump_json_bytes(document))
+        return
+    
+    with open(output_file, 'wb') as f:
+        f.write(b'{\n  "metadata": ')
+        f.write(dump_json_bytes(metadata, indent=True).replace(b'\n', b'\n  '))
+        f.write(b',\n  "dictionaries": ')
+        f.write(dump_json_bytes(dictionaries, indent=True).replace(b'\n', b'\n  '))
+        f.write(b',\n  "columns": {')
+        separator = b'\n    '
+        for name, values in columns.items():
+            f.write(separator + dump_json_bytes(name) + b': ' + dump_json_bytes(values))
+            separator = b',\n    '
+        f.write(b'\n  }\n}\n')
+
+def parse_year_label(col):
+    """Return a column label as an int if it is a whole number, else None.
+
+    Header cells arrive as ints from Excel or as digit strings, so both are
+    checked directly instead of relying on int() raising for other labels.
+    """
+    if isinstance(col, (int, np.integer)) and not isinstance(col, bool):
+        return int(col)
+    if isinstance(col, (float, np.floating)) and float(col).is_integer():
+        return int(col)
+    if isinstance(col, str):
+        label = col.strip()
+        if label.isdecimal():
+            return int(label)
+    return None
+
+@cached_to_disk
+def transform_sheet(file_path, sheet_name):
+    """Read one sheet and reshape its year columns into long-form data points.
+
+    Returns the data points as a frame, which is empty if the sheet has no
+    country column, or None if the sheet could not be read.
+    """
+    sheet_num = int(sheet_name)
+    indicator_name = INDICATOR_NAMES.get(sheet_num, f"Indicator {sheet_num}")
+    category = INDICATOR_CATEGORIES.get(sheet_num, "Unknown")
+    
+    log.debug("\n📄 Processing sheet %d: %s", sheet_num, indicator_name)
+    log.debug("-" * 50)
+    
+    try:
+        df = load_sheet(file_path, sheet_name)
+        log.debug("   Shape: %d rows × %d columns", df.shape[0], df.shape[1])
+        
+        # Find the country column
+        country_col = None
+        for col in ['Country', 'Country Code']:
+            if col in df.columns:
+                country_col = col
+                break
+        
+        if country_col is None:
+            log.warning("   ❌ No country column found in sheet %d", sheet_num)
+            # A definite result, so it is cached like any other sheet
+            return pd.DataFrame(columns=DATA_POINT_COLUMNS)
+        
+        # Find year columns (numeric columns that are years)
+        year_cols = []
+        for col in df.columns:
+            if col != country_col and col not in ID_COLUMNS:
+                year_val = parse_year_label(col)
+                if year_val is not None and 2000 <= year_val <= 2030:  # Reasonable year range
+                    year_cols.append(col)
+        
+        log.debug("   📅 Found year columns: %s", year_cols)
+        
+        # Extract data points: reshape wide year columns to long form
+        long = df.melt(id_vars=[country_col], value_vars=year_cols,
+                       var_name='year', value_name='value', ignore_index=False)
+        long = long.rename(columns={country_col: 'country'})
+        long = long[long['country'].notna() & long['country'].ne('..')].copy()
+        long['value'] = pd.to_numeric(long['value'], errors='coerce')
+        long = long.dropna(subset=['value'])
+        # Keep the row-by-row ordering of the original sheet
+        long = long.sort_index(kind='stable')
+        long['year'] = long['year'].astype(int)
+        
+        long['indicator'] = indicator_name
+        long['category'] = category
+        long['layer'] = "Basic" if category == "Foundational Capabilities" else "Advanced"
+        long['unit'] = "Various"  # We'll need to determine units per indicator
+        
+        log.debug("   ✅ Extracted %d data points", len(long))
+        return long[DATA_POINT_COLUMNS]
+        
+    except Exception as e:
+        log.warning("   ❌ Error processing sheet %d: %s", sheet_num, e)
+        return None
+
 def transform_excel_data(file_path):
     """Transform the Excel file into the dashboard format"""
-    print("🔄 TRANSFORMING EXCEL DATA")
-    print("=" * 60)
+    log.info("🔄 TRANSFORMING EXCEL DATA")
+    log.info("=" * 60)
     
     try:
-        xl = pd.ExcelFile(file_path)
-        print(f"📊 Found {len(xl.sheet_names)} sheets: {xl.sheet_names}")
+        key = source_key(file_path)
+        if outputs_up_to_date(key):
+            log.info("✅ %s is up to date with %s, nothing to do", OUTPUT_FILE, file_path)
+            log.info("   (delete %s to force a rebuild)", SOURCE_KEY_FILE)
+            return True
+        
+        sheet_names = list_sheet_names(file_path)
+        log.info("📊 Found %d sheets: %s", len(sheet_names), sheet_names)
         
-        all_data_points = []
+        all_frames = []
         processed_sheets = 0
+        failed_sheets = 0
         
-        for sheet_name in xl.sheet_names:
-            sheet_num = int(sheet_name)
-            indicator_name = INDICATOR_NAMES.get(sheet_num, f"Indicator {sheet_num}")
-            category = INDICATOR_CATEGORIES.get(sheet_num, "Unknown")
-            
-            print(f"\n📄 Processing sheet {sheet_num}: {indicator_name}")
-            print("-" * 50)
-            
-            try:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-                print(f"   Shape: {df.shape[0]} rows × {df.shape[1]} columns")
-                
-                # Find the country column
-                country_col = None
-                for col in ['Country', 'Country Code']:
-                    if col in df.columns:
-                        country_col = col
-                        break
-                
-                if country_col is None:
-                    print(f"   ❌ No country column found in sheet {sheet_num}")
-                    continue
-                
-                # Find year columns (numeric columns that are years)
-                year_cols = []
-                for col in df.columns:
-                    if col not in [country_col, 'Code', 'Region', 'Income group', 'PartnerISO3', 'TradeFlowName']:
-                        try:
-                            year_val = int(col)
-                            if 2000 <= year_val <= 2030:  # Reasonable year range
-                                year_cols.append(col)
-                        except:
-                            pass
-                
-                print(f"   📅 Found year columns: {year_cols}")
-                
-                # Extract data points
-                sheet_data_points = 0
-                for _, row in df.iterrows():
-                    country = row[country_col]
-                    if pd.isna(country) or country == '..':
-                        continue
-                    
-                    for year_col in year_cols:
-                        value = row[year_col]
-                        if pd.isna(value) or value == '..':
-                            continue
-                        
-                        try:
-                            numeric_value = float(value)
-                            data_point = {
-                                "indicator": indicator_name,
-                                "country": country,
-                                "year": int(year_col),
-                                "value": numeric_value,
-                                "category": category,
-                                "layer": "Basic" if category == "Foundational Capabilities" else "Advanced",
-                                "unit": "Various"  # We'll need to determine units per indicator
-                            }
-                            all_data_points.append(data_point)
-                            sheet_data_points += 1
-                        except:
-                            continue
-                
-                print(f"   ✅ Extracted {sheet_data_points} data points")
+        # The workbook is parsed once by the first sheet that misses the
+        # on-disk cache and shared with the rest
+        for sheet_name in sheet_names:
+            frame = transform_sheet(file_path, sheet_name)
+            if frame is None:
+                failed_sheets += 1
+            elif not frame.empty:
+                all_frames.append(frame)
                 processed_sheets += 1
-                
-            except Exception as e:
-                print(f"   ❌ Error processing sheet {sheet_num}: {str(e)}")
-                continue
-        
-        print(f"\n📊 TRANSFORMATION SUMMARY")
-        print("=" * 60)
-        print(f"✅ Successfully processed {processed_sheets} sheets")
-        print(f"📈 Total data points: {len(all_data_points)}")
-        
-        # Create metadata
-        countries = sorted(list(set([dp['country'] for dp in all_data_points])))
-        years = sorted(list(set([dp['year'] for dp in all_data_points])))
-        indicators = sorted(list(set([dp['indicator'] for dp in all_data_points])))
-        categories = sorted(list(set([dp['category'] for dp in all_data_points])))
+        
+        dataset = pd.concat(all_frames, ignore_index=True) if all_frames else pd.DataFrame(columns=DATA_POINT_COLUMNS)
+        # Repeating strings are held as categoricals (one copy per distinct value)
+        dataset = dataset.astype({col: 'category' for col in DICTIONARY_COLUMNS})
+        
+        log.info("\n📊 TRANSFORMATION SUMMARY")
+        log.info("=" * 60)
+        log.info("✅ Successfully processed %d sheets", processed_sheets)
+        log.info("📈 Total data points: %d", len(dataset))
+        
+        # Create metadata, reusing the sorted vocabularies from the encoding
+        dictionaries, columns = encode_columns(dataset)
+        countries = dictionaries['country']
+        years = np.unique(columns['year']).tolist()
+        indicators = dictionaries['indicator']
+        categories = dictionaries['category']
         
         metadata = {
             "title": "Western Balkans Dashboard Data",
             "description": "Comprehensive dataset covering indicators across Foundational and Digital Capabilities",
             "transformation_date": datetime.now().isoformat(),
             "source_file": "data.xlsx",
-            "total_data_points": len(all_data_points),
+            "total_data_points": len(dataset),
             "countries": countries,
             "years": years,
             "indicators": indicators,
             "categories": categories
         }
         
-        # Create the consolidated dataset
-        consolidated_data = {
-            "metadata": metadata,
-            "data_points": all_data_points
-        }
-        
         # Save to file
-        output_file = "transformed_data_v2/consolidated_dataset.json"
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+        
+        write_consolidated_json(metadata, dictionaries, columns, OUTPUT_FILE)
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(consolidated_data, f, indent=2, ensure_ascii=False)
+        log.info("💾 Saved to: %s", OUTPUT_FILE)
         
-        print(f"💾 Saved to: {output_file}")
-        print(f"📊 Countries: {len(countries)} ({', '.join(countries)})")
-        print(f"📅 Years: {len(years)} ({min(years)}-{max(years)})")
-        print(f"📈 Indicators: {len(indicators)}")
-        print(f"🏷️ Categories: {', '.join(categories)}")
+        if HAS_PYARROW:
+            dataset.to_parquet(PARQUET_FILE, engine='pyarrow', compression='zstd', index=False)
+            log.info("💾 Saved to: %s", PARQUET_FILE)
+        
+        # Record the inputs only once every output has been written, and only
+        # when no sheet failed to read, so that those are retried next time.
+        # Sheets skipped for lacking a country column do not count as failures.
+        if failed_sheets == 0:
+            with open(SOURCE_KEY_FILE, 'w', encoding='utf-8') as f:
+                f.write(key)
+        else:
+            log.warning("⚠️ %d of %d sheets failed; they will be retried on the next run",
+                        failed_sheets, len(sheet_names))
+            if os.path.exists(SOURCE_KEY_FILE):
+                os.remove(SOURCE_KEY_FILE)
+        
+        log.info("📊 Countries: %d (%s)", len(countries), ', '.join(countries))
+        if years:
+            log.info("📅 Years: %d (%s-%s)", len(years), min(years), max(years))
+        else:
+            log.info("📅 Years: 0")
+        log.info("📈 Indicators: %d", len(indicators))
+        log.info("🏷️ Categories: %s", ', '.join(categories))
         
         return True
         
     except Exception as e:
-        print(f"❌ Error transforming data: {str(e)}")
+        log.error("❌ Error transforming data: %s", e)
         return False
 
 if __name__ == "__main__":
+    # Per-sheet details are logged at DEBUG; set LOG_LEVEL=DEBUG to see them
+    level_name = os.environ.get("LOG_LEVEL", "INFO").upper()
+    level = logging.getLevelName(level_name)
+    logging.basicConfig(level=level if isinstance(level, int) else logging.INFO,
+                        format="%(message)s", stream=sys.stdout)
+    if not isinstance(level, int):
+        log.warning("⚠️ Unknown LOG_LEVEL %r, using INFO", level_name)
+    
     file_path = "data.xlsx"
     
     if not os.path.exists(file_path):
-        print(f"❌ Excel file not found: {file_path}")
+        log.error("❌ Excel file not found: %s", file_path)
         exit(1)
     
     success = transform_excel_data(file_path)
     
     if success:
-        print("\n🎉 Transformation completed successfully!")
-        print("You can now refresh your dashboard to see all indicators.")
+        log.info("\n🎉 Transformation completed successfully!")
+        log.info("You can now refresh your dashboard to see all indicators.")
     else:
-        print("\n❌ Transformation failed. Check the errors above.")
+        log.error("\n❌ Transformation failed. Check the errors above.")
@@ -12,7 +12,9 @@ async function initDashboard() {
         }
         
         const data = await response.json();
-        allIndicatorsData = data.data_points || [];
+        allIndicatorsData = data.columns
+            ? decodeColumns(data.columns, data.dictionaries || {})
+            : (data.data_points || []);
         metadata = data.metadata || {};
         
     console.log('Loaded data:', allIndicatorsData.length, 'data points');
@@ -61,6 +63,26 @@ async function initDashboard() {
     }
 }
 
+// Rebuild row objects from the columnar dataset layout
+// String columns are stored as indices into the matching dictionary
+function decodeColumns(columns, dictionaries) {
+    const names = Object.keys(columns);
+    const length = names.length > 0 ? columns[names[0]].length : 0;
+    const rows = new Array(length);
+
+    for (let i = 0; i < length; i++) {
+        const row = {};
+        names.forEach(name => {
+            const dictionary = dictionaries[name];
+            const raw = columns[name][i];
+            row[name] = dictionary ? dictionary[raw] : raw;
+        });
+        rows[i] = row;
+    }
+
+    return rows;
+}
+
 // Populate filter dropdowns
 function populateFilters() {
     console.log('populateFilters called with data length:', allIndicatorsData.length);